@@ -7,12 +7,20 @@ using a test dataset.
 """
 import os
 import sys
-import json
+import mmap
 import logging
+import argparse
 import asyncio
 from pathlib import Path
 from typing import List, Dict, Any, Tuple
 
+import aiofiles
+import numpy as np
+import orjson
+
+# Chunk size for streaming the results report to disk
+WRITE_CHUNK_SIZE = 1 << 20
+
 # Add the project root to the Python path
 sys.path.append(str(Path(__file__).parent.parent))
 
@@ -32,6 +40,12 @@ class DetectionEvaluator:
     def __init__(self):
         self.pipeline = SecurityPipeline()
         self.results = []
+        # Per-case (expected_decision, expected_threat, predicted_decision,
+        # predicted_threat) index rows, vectorized into metrics afterwards
+        self._label_rows = []
+        # Enum member -> ordinal, built once instead of per evaluated case
+        self._decision_index = {d: i for i, d in enumerate(DecisionType)}
+        self._threat_index = {t: i for i, t in enumerate(ThreatType)}
         self.metrics = {
             'total': 0,
             'correct': 0,
@@ -57,8 +71,11 @@ class DetectionEvaluator:
             List of test cases, each with 'prompt', 'expected_threat_type', and 'expected_decision'
         """
         try:
-            with open(test_data_path, 'r') as f:
-                test_cases = json.load(f)
+            # Memory-map the file so the parser reads the page cache
+            # directly instead of copying the whole file into a bytes object
+            with open(test_data_path, 'rb') as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                    test_cases = orjson.loads(memoryview(buffer))
             logger.info(f"Loaded {len(test_cases)} test cases from {test_data_path}")
             return test_cases
         except Exception as e:
@@ -93,30 +110,19 @@ class DetectionEvaluator:
             is_correct = (decision.decision == expected_decision and 
                          decision.threat_type == expected_threat)
             
-            # Update metrics
-            self.metrics['total'] += 1
-            
-            if is_correct:
-                self.metrics['correct'] += 1
-                if expected_decision == DecisionType.BLOCK:
-                    self.metrics['true_positives'] += 1
-                    if expected_threat != ThreatType.BENIGN:
-                        self.metrics['threat_type_metrics'][expected_threat.value]['tp'] += 1
-                else:
-                    self.metrics['true_negatives'] += 1
-            else:
-                if expected_decision == DecisionType.BLOCK and decision.decision != DecisionType.BLOCK:
-                    self.metrics['false_negatives'] += 1
-                    if expected_threat != ThreatType.BENIGN:
-                        self.metrics['threat_type_metrics'][expected_threat.value]['fn'] += 1
-                elif expected_decision != DecisionType.BLOCK and decision.decision == DecisionType.BLOCK:
-                    self.metrics['false_positives'] += 1
-                    if decision.threat_type != ThreatType.BENIGN:
-                        self.metrics['threat_type_metrics'][decision.threat_type.value]['fp'] += 1
+            # Record label indices only; metrics are computed in one
+            # vectorized pass by compute_metrics after all cases finish.
+            # A single list append is atomic, so no lock is needed here.
+            self._label_rows.append((
+                self._decision_index[expected_decision],
+                self._threat_index[expected_threat],
+                self._decision_index[decision.decision],
+                self._threat_index[decision.threat_type]
+            ))
             
             return {
                 'test_case': test_case,
-                'decision': decision.dict(),
+                'decision': decision.model_dump(),
                 'is_correct': is_correct,
                 'expected_decision': expected_decision.value,
                 'expected_threat': expected_threat.value
@@ -130,6 +136,56 @@ class DetectionEvaluator:
                 'is_correct': False
             }
     
+    def compute_metrics(self):
+        """Compute evaluation metrics from the recorded label rows.
+
+        Builds NumPy arrays of expected/predicted label indices and derives
+        all counts with vectorized masks and a per-threat confusion matrix,
+        replacing per-case dict mutations.
+        """
+        if not self._label_rows:
+            return
+
+        labels = np.array(self._label_rows, dtype=np.int64)
+        expected_decision = labels[:, 0]
+        expected_threat = labels[:, 1]
+        predicted_decision = labels[:, 2]
+        predicted_threat = labels[:, 3]
+
+        block = self._decision_index[DecisionType.BLOCK]
+        benign = self._threat_index[ThreatType.BENIGN]
+
+        correct = ((expected_decision == predicted_decision) &
+                   (expected_threat == predicted_threat))
+        true_positive = correct & (expected_decision == block)
+        true_negative = correct & (expected_decision != block)
+        false_negative = (~correct & (expected_decision == block) &
+                          (predicted_decision != block))
+        false_positive = (~correct & (expected_decision != block) &
+                          (predicted_decision == block))
+
+        self.metrics['total'] = len(labels)
+        self.metrics['correct'] = int(correct.sum())
+        self.metrics['true_positives'] = int(true_positive.sum())
+        self.metrics['true_negatives'] = int(true_negative.sum())
+        self.metrics['false_negatives'] = int(false_negative.sum())
+        self.metrics['false_positives'] = int(false_positive.sum())
+
+        # Per-threat confusion counts: tp/fn keyed by the expected threat,
+        # fp keyed by the predicted threat, all in one np.add.at each
+        confusion = np.zeros((len(ThreatType), 3), dtype=np.int64)
+        np.add.at(confusion[:, 0], expected_threat[true_positive], 1)
+        np.add.at(confusion[:, 1], predicted_threat[false_positive], 1)
+        np.add.at(confusion[:, 2], expected_threat[false_negative], 1)
+
+        for i, threat_type in enumerate(ThreatType):
+            if i == benign:
+                continue
+            threat_metrics = self.metrics['threat_type_metrics'][threat_type.value]
+            threat_metrics['tp'] = int(confusion[i, 0])
+            threat_metrics['fp'] = int(confusion[i, 1])
+            threat_metrics['fn'] = int(confusion[i, 2])
+
     def print_metrics(self):
         """Print evaluation metrics."""
         total = self.metrics['total']
@@ -170,8 +226,20 @@ class DetectionEvaluator:
                 print(f"  F1: {f:.4f}")
 
 
+def parse_args():
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description="Evaluate detection accuracy")
+    parser.add_argument(
+        '--data_parallel', type=int, default=1,
+        help="Number of test cases to evaluate concurrently (default: 1)"
+    )
+    return parser.parse_args()
+
+
 async def main():
     """Main function to run the evaluation."""
+    args = parse_args()
+
     # Initialize evaluator
     evaluator = DetectionEvaluator()
     await evaluator.initialize()
@@ -188,14 +256,21 @@ async def main():
         logger.error("No test cases found. Exiting.")
         return
     
-    # Run evaluation
-    logger.info("Starting evaluation...")
-    for i, test_case in enumerate(test_cases, 1):
-        logger.info(f"Evaluating test case {i}/{len(test_cases)}")
-        result = await evaluator.evaluate_test_case(test_case)
-        evaluator.results.append(result)
+    # Run evaluation with bounded concurrency; gather preserves input
+    # order so results still line up with test_cases
+    logger.info(f"Starting evaluation (data_parallel={args.data_parallel})...")
+    semaphore = asyncio.Semaphore(args.data_parallel)
+
+    async def evaluate_bounded(test_case):
+        async with semaphore:
+            return await evaluator.evaluate_test_case(test_case)
+
+    evaluator.results = list(await asyncio.gather(
+        *(evaluate_bounded(tc) for tc in test_cases)
+    ))
     
     # Print results
+    evaluator.compute_metrics()
     evaluator.print_metrics()
     
     # Save detailed results
@@ -204,11 +279,14 @@ async def main():
         "..", "reports", "evaluation_results.json"
     )
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    with open(output_path, 'w') as f:
-        json.dump({
-            'metrics': evaluator.metrics,
-            'results': evaluator.results
-        }, f, indent=2)
+    payload = orjson.dumps({
+        'metrics': evaluator.metrics,
+        'results': evaluator.results
+    }, option=orjson.OPT_INDENT_2)
+    # Write in chunks off the event loop so a large report doesn't block it
+    async with aiofiles.open(output_path, 'wb') as f:
+        for offset in range(0, len(payload), WRITE_CHUNK_SIZE):
+            await f.write(payload[offset:offset + WRITE_CHUNK_SIZE])
     
     logger.info(f"Detailed results saved to {output_path}")
 
@@ -3,8 +3,10 @@ MCP Security Gateway Main Application
 """
 import asyncio
 import logging
+import os
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 from typing import Dict, Optional
 
@@ -18,7 +20,8 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="MCP Security Gateway",
     description="Real-time threat detection for MCP requests",
-    version="0.1.0"
+    version="0.1.0",
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -39,6 +42,11 @@ async def startup_event():
     await security_pipeline.initialize()
     logger.info("MCP Security Gateway started successfully")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background tasks on shutdown"""
+    await security_pipeline.shutdown()
+
 @app.post("/analyze", response_model=SecurityDecision)
 async def analyze_request(request: MCPRequest) -> SecurityDecision:
     """
@@ -65,4 +73,16 @@ async def get_metrics():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8080)
+    # uvloop + httptools replace the stdlib event loop and HTTP parser with
+    # native implementations; keep-alive lets clients reuse connections
+    # instead of paying TCP setup per request. Multi-worker mode needs the
+    # import-string form of the app.
+    uvicorn.run(
+        "src.gateway.main:app",
+        host="0.0.0.0",
+        port=8080,
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.environ.get("GATEWAY_WORKERS", "1")),
+        timeout_keep_alive=30
+    )
@@ -1,6 +1,7 @@
 """
 Data models for MCP Security Gateway
 """
+import time
 from pydantic import BaseModel, Field
 from typing import Dict, List, Optional, Any
 from datetime import datetime
@@ -26,7 +27,8 @@ class MCPRequest(BaseModel):
     tool_call: Optional[str] = Field(None, description="Tool call parameters")
     context: Optional[str] = Field(None, description="Request context")
     client_id: str = Field(..., description="Client identifier")
-    timestamp: datetime = Field(default_factory=datetime.now)
+    timestamp: int = Field(default_factory=time.time_ns,
+                           description="Arrival time in nanoseconds since the epoch")
 
 class SecurityDecision(BaseModel):
     """Security decision response"""
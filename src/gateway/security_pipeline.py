@@ -2,36 +2,56 @@
 MCP Security Pipeline for threat detection and analysis
 """
 import asyncio
+import itertools
+import re
 import time
-from typing import Dict, Any, Optional
+from typing import Any, Dict, List, Optional, Tuple
 import logging
 from .models import MCPRequest, SecurityDecision, DecisionType, ThreatType
 import uuid
 
 logger = logging.getLogger(__name__)
 
+# Malicious keywords for the mock detector, compiled into one alternation
+# at import: a single C-level scan per prompt, case-insensitive without
+# lowercasing or tokenizing the prompt first. The keyword list stays the
+# source of truth; the pattern is generated from it.
+_BAD_KEYWORDS = frozenset({"ignore", "password", "hack", "exploit"})
+_BAD_KEYWORD_RE = re.compile(
+    "|".join(map(re.escape, sorted(_BAD_KEYWORDS))), re.IGNORECASE)
+
+# Batching parameters: requests arriving within the window are classified
+# together, so a real model sees one batched call instead of N single ones.
+MAX_BATCH_SIZE = 32
+BATCH_WINDOW_S = 0.005
+
+# Enum member -> string value, precomputed so the metrics hot path does a
+# dict lookup instead of going through Enum's .value descriptor
+_DECISION_VALUES = {decision: decision.value for decision in DecisionType}
+_THREAT_VALUES = {threat: threat.value for threat in ThreatType}
+
+# Shared explanation for the common ALLOW path, so benign requests don't
+# build a fresh dict each time
+_ALLOW_EXPLANATION = {"reason": "Mock implementation"}
+
 class SecurityPipeline:
     """Main security pipeline for MCP request analysis"""
     
     def __init__(self):
         self.initialized = False
-        self.metrics = {
-            "requests_processed": 0,
-            "avg_processing_time_ms": 0.0,
-            "decisions": {
-                "ALLOW": 0,
-                "BLOCK": 0,
-                "CONFIRM": 0
-            },
-            "threats_detected": {
-                "prompt_injection": 0,
-                "data_exfiltration": 0,
-                "agent_hijacking": 0,
-                "resource_dos": 0,
-                "tool_abuse": 0,
-                "context_poisoning": 0
-            }
-        }
+        self._queue: Optional["asyncio.Queue[Tuple[MCPRequest, asyncio.Future]]"] = None
+        self._batch_task: Optional[asyncio.Task] = None
+        # Trace IDs: one random prefix per pipeline instance plus a counter,
+        # so the hot path avoids drawing 16 random bytes per request
+        self._trace_prefix = uuid.uuid4().hex
+        self._trace_counter = itertools.count(1)
+        # Prometheus-style counters: each is a single flat slot incremented
+        # on the hot path; get_metrics assembles the nested view on read
+        self._requests_processed = 0
+        self._total_processing_time_ms = 0.0
+        self._decision_counts = {value: 0 for value in _DECISION_VALUES.values()}
+        self._threat_counts = {_THREAT_VALUES[threat]: 0 for threat in ThreatType
+                               if threat is not ThreatType.BENIGN}
         
     async def initialize(self):
         """Initialize models and connections"""
@@ -43,10 +63,64 @@ class SecurityPipeline:
         
         # Simulate model loading
         await asyncio.sleep(1)
-        
+
+        self._ensure_batcher()
         self.initialized = True
         logger.info("Security pipeline initialized")
-        
+
+    async def shutdown(self):
+        """Stop the background batching task"""
+        if self._batch_task is not None:
+            self._batch_task.cancel()
+            try:
+                await self._batch_task
+            except asyncio.CancelledError:
+                pass
+            self._batch_task = None
+
+    def _ensure_batcher(self):
+        """Start the background batching task if it is not running"""
+        if self._batch_task is None or self._batch_task.done():
+            self._queue = asyncio.Queue()
+            self._batch_task = asyncio.get_event_loop().create_task(self._batch_worker())
+
+    async def _batch_worker(self):
+        """Coalesce queued requests and classify them in one batch.
+
+        Waits for the first request, then keeps draining the queue until
+        MAX_BATCH_SIZE items are collected or BATCH_WINDOW_S passes with
+        no new arrivals, and resolves each request's future.
+        """
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < MAX_BATCH_SIZE:
+                try:
+                    batch.append(await asyncio.wait_for(
+                        self._queue.get(), timeout=BATCH_WINDOW_S))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                predictions = self._classify_batch([r.prompt for r, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), prediction in zip(batch, predictions):
+                if not future.done():
+                    future.set_result(prediction)
+
+    def _classify_batch(self, prompts: List[str]) -> List[bool]:
+        """Classify a batch of prompts as malicious or benign.
+
+        Single entry point for the (future) ML model's batched predict;
+        for now runs the mock keyword check per prompt.
+        """
+        return [_BAD_KEYWORD_RE.search(prompt) is not None
+                for prompt in prompts]
+
     async def analyze(self, request: MCPRequest) -> SecurityDecision:
         """
         Analyze an MCP request for security threats
@@ -57,55 +131,60 @@ class SecurityPipeline:
         Returns:
             SecurityDecision with analysis results
         """
-        start_time = time.time()
-        trace_id = str(uuid.uuid4())
-        
-        # TODO: Implement actual analysis
-        # For now, return a mock response
-        is_malicious = any(keyword in request.prompt.lower() 
-                          for keyword in ["ignore", "password", "hack", "exploit"])
-        
-        if is_malicious:
-            decision = DecisionType.BLOCK
-            threat_type = ThreatType.PROMPT_INJECTION
-            risk_score = 0.95
-            confidence = 0.9
-        else:
-            decision = DecisionType.ALLOW
-            threat_type = ThreatType.BENIGN
-            risk_score = 0.05
-            confidence = 0.95
-            
-        # Update metrics
-        processing_time_ms = (time.time() - start_time) * 1000
-        self._update_metrics(decision, threat_type, processing_time_ms)
+        start_time = time.perf_counter_ns()
+        trace_id = f"{self._trace_prefix}-{next(self._trace_counter):x}"
         
+        # Queue the request for batched classification and wait for the
+        # worker to resolve it
+        self._ensure_batcher()
+        future = asyncio.get_event_loop().create_future()
+        await self._queue.put((request, future))
+        is_malicious = await future
+
+        if not is_malicious:
+            # Hot path: most traffic is benign, so return immediately with
+            # the shared explanation instead of building one per request.
+            # Metric counters are bumped inline; the decision and threat
+            # are constants here, so no enum dispatch is needed.
+            processing_time_ms = (time.perf_counter_ns() - start_time) / 1e6
+            self._requests_processed += 1
+            self._total_processing_time_ms += processing_time_ms
+            self._decision_counts["ALLOW"] += 1
+            return SecurityDecision(
+                decision=DecisionType.ALLOW,
+                risk_score=0.05,
+                confidence=0.95,
+                threat_type=ThreatType.BENIGN,
+                trace_id=trace_id,
+                explanation=_ALLOW_EXPLANATION,
+                processing_time_ms=processing_time_ms
+            )
+
+        processing_time_ms = (time.perf_counter_ns() - start_time) / 1e6
+        self._requests_processed += 1
+        self._total_processing_time_ms += processing_time_ms
+        self._decision_counts["BLOCK"] += 1
+        self._threat_counts["prompt_injection"] += 1
+
         return SecurityDecision(
-            decision=decision,
-            risk_score=risk_score,
-            confidence=confidence,
-            threat_type=threat_type,
+            decision=DecisionType.BLOCK,
+            risk_score=0.95,
+            confidence=0.9,
+            threat_type=ThreatType.PROMPT_INJECTION,
             trace_id=trace_id,
             explanation={"reason": "Mock implementation"},
             processing_time_ms=processing_time_ms
         )
         
     async def get_metrics(self) -> Dict[str, Any]:
-        """Get current pipeline metrics"""
-        return self.metrics
-        
-    def _update_metrics(self, decision: DecisionType, threat_type: ThreatType, 
-                       processing_time_ms: float):
-        """Update internal metrics"""
-        self.metrics["requests_processed"] += 1
-        
-        # Update running average of processing time
-        total_time = self.metrics["avg_processing_time_ms"] * (self.metrics["requests_processed"] - 1)
-        self.metrics["avg_processing_time_ms"] = (total_time + processing_time_ms) / self.metrics["requests_processed"]
-        
-        # Update decision counts
-        self.metrics["decisions"][decision.value] += 1
-        
-        # Update threat counts
-        if threat_type != "benign":
-            self.metrics["threats_detected"][threat_type.value] += 1
+        """Get a snapshot of current pipeline metrics"""
+        # Derive the average on read; the hot path only accumulates a sum
+        processed = self._requests_processed
+        return {
+            "requests_processed": processed,
+            "avg_processing_time_ms": (
+                self._total_processing_time_ms / processed if processed else 0.0
+            ),
+            "decisions": dict(self._decision_counts),
+            "threats_detected": dict(self._threat_counts)
+        }